@@ -6,7 +6,6 @@
 
 import sys
 import re
-import os
 import time
 from colorama import Fore, Style, init
 
@@ -17,31 +16,45 @@ class TuringMachine:
     def __init__(self, tape, initial_state, transitions, blank_symbol='_'):
         """
         Turing Machine initialization.
-        :param tape: Initial tape content as a list of characters.
+        :param tape: Initial tape content as a string or list of characters.
         :param initial_state: Starting state of the machine.
         :param transitions: Dictionary of transitions {(state, symbol): (new_state, new_symbol, direction)}
         :param blank_symbol: Symbol representing a blank cell on the tape.
         """
-        self.tape = tape
         self.head = 0
         self.state = initial_state
         self.transitions = transitions
         self.blank_symbol = blank_symbol
+        # The tape holds one byte per cell, an id into the symbols seen in the tape and transitions
+        symbols = [blank_symbol] + list(tape)
+        for (state, symbol), (new_state, new_symbol, direction) in transitions.items():
+            symbols += [symbol, new_symbol]
+        self._symbols = list(dict.fromkeys(symbols))
+        if len(self._symbols) > 256:
+            raise ValueError("At most 256 distinct tape symbols are supported")
+        self._symbol_id = {c: i for i, c in enumerate(self._symbols)}
+        self._blank = self._symbol_id[blank_symbol]
+        self.tape = bytearray(self._symbol_id[c] for c in tape)
+        # Decoded tape for callers of render, None when the tape has changed since.
+        # Animation frames after the first go through render_update, which reads cells directly.
+        self._tape_str_cache = None
 
     def step(self):
         """Executes one step of the Turing Machine."""
-        current_symbol = self.tape[self.head] if self.head < len(self.tape) else self.blank_symbol
-        key = (self.state, current_symbol)
+        current_symbol = self.tape[self.head] if self.head < len(self.tape) else self._blank
+        key = (self.state, self._symbols[current_symbol])
 
         if key not in self.transitions:
             return False  # Halting condition
 
         new_state, new_symbol, direction = self.transitions[key]
         # Update the tape
+        new_symbol = self._symbol_id[new_symbol]
         if self.head < len(self.tape):
             self.tape[self.head] = new_symbol
         else:
             self.tape.append(new_symbol)
+        self._tape_str_cache = None
 
         # Move the head
         if direction == 'R':
@@ -55,24 +68,44 @@ class TuringMachine:
 
     def render(self):
         """Renders the current state of the Turing Machine tape and head."""
-        display_tape = ''.join(self.tape)
-        tape_with_head = ''.join([
-            f"{Fore.RED}{Style.BRIGHT}{c}{Style.RESET_ALL}" if i == self.head else c
-            for i, c in enumerate(display_tape)
-        ])
+        if self._tape_str_cache is None:
+            self._tape_str_cache = ''.join([self._symbols[i] for i in self.tape])
+        display_tape = tape_with_head = self._tape_str_cache
+        if self.head < len(display_tape):
+            tape_with_head = (f"{display_tape[:self.head]}{Fore.RED}{Style.BRIGHT}{display_tape[self.head]}"
+                              f"{Style.RESET_ALL}{display_tape[self.head + 1:]}")
         return f"Tape: {tape_with_head}\nHead: {' ' * self.head + '^'}\nState: {self.state}"
 
+    def render_update(self, prev_head):
+        """
+        Renders the changes since the frame rendered with the head at prev_head,
+        as ANSI cursor movements relative to the top left corner of that frame.
+        """
+        column = len('Tape: ') + 1
+        update = []
+        # Only the cell under the old head can have been written
+        if prev_head < len(self.tape):
+            update.append(f"\x1b[1;{column + prev_head}H{self._symbols[self.tape[prev_head]]}")
+        if self.head < len(self.tape):
+            update.append(f"\x1b[1;{column + self.head}H{Fore.RED}{Style.BRIGHT}{self._symbols[self.tape[self.head]]}{Style.RESET_ALL}")
+        update.append(f"\x1b[2;{column + prev_head}H \x1b[2;{column + self.head}H^")
+        update.append(f"\x1b[3;{len('State: ') + 1}H{self.state}\x1b[K\x1b[4;1H")
+        return ''.join(update)
+
 
 def animate_turing_machine(machine, delay=0.5):
     """Animates the Turing Machine execution."""
     try:
+        # Draw the first frame, later frames only redraw what changed
+        sys.stdout.write(f"\x1b[2J\x1b[H{machine.render()}\n")
         while True:
-            os.system('cls' if os.name == 'nt' else 'clear')
-            print(machine.render())
+            prev_head = machine.head
             if not machine.step():
                 print("\nTuring Machine halted.")
                 break
             time.sleep(delay)
+            sys.stdout.write(machine.render_update(prev_head))
+            sys.stdout.flush()
     except KeyboardInterrupt:
         print("\nAnimation stopped by user!")
 
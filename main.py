@@ -12,8 +12,19 @@ import os
 import sys
 import re
 import colorama
+import numpy as np
 from tabulate import tabulate
 from colorama import Fore, Back, Style
+from tm_encoding import DIR_CODES, DIR_DELTA, NO_TRANSITION
+
+try:
+    # Ahead-of-time compiled kernel, built by running tm_kernel.py
+    from tm_kernel_aot import run_tm
+except ImportError:
+    from tm_kernel import run_tm
+
+# Number of cells allocated for a fresh tape
+INITIAL_TAPE_SIZE = 1024
 
 class TuringMachine:
     def __init__(self, states, alphabet, transitions, start_state, accept_state, reject_state, blank_symbol='_'):
@@ -35,77 +46,209 @@ class TuringMachine:
         self.accept_state = accept_state
         self.reject_state = reject_state
         self.blank_symbol = blank_symbol
+        self._compile()
         self.reset()
 
+    def _compile(self):
+        """Intern states and symbols to small ints and lower the transitions into a table."""
+        state_names = list(self.states)
+        symbols = list(self.alphabet) + [self.blank_symbol]
+        for (state, symbol), (new_state, write_symbol, direction) in self.transitions.items():
+            state_names += [state, new_state]
+            symbols += [symbol, write_symbol]
+        state_names += [self.start_state, self.accept_state, self.reject_state]
+        self._state_names = list(dict.fromkeys(state_names))
+        self._symbols = list(dict.fromkeys(symbols))
+        self._state_id = {s: i for i, s in enumerate(self._state_names)}
+        self._symbol_id = {s: i for i, s in enumerate(self._symbols)}
+        self._halt_ids = (self._state_id[self.accept_state], self._state_id[self.reject_state])
+        self._compile_decoder()
+
+        n_states, n_symbols = len(self._state_names), len(self._symbols)
+        self._trans_table = np.full((n_states, n_symbols, 3), NO_TRANSITION, dtype=np.int32)
+        self._trans_raw = [[None] * n_symbols for _ in range(n_states)]
+        for (state, symbol), (new_state, write_symbol, direction) in self.transitions.items():
+            if self._state_id[state] in self._halt_ids:
+                # The machine halts before looking at these
+                continue
+            i, j = self._state_id[state], self._symbol_id[symbol]
+            # Like step always did, anything but R or L leaves the head where it is
+            self._trans_table[i, j] = (self._state_id[new_state], self._symbol_id[write_symbol],
+                                     DIR_CODES.get(direction, DIR_CODES['N']))
+            self._trans_raw[i][j] = (new_state, write_symbol, direction)
+
+        # Find scanning states, which move one way over some symbols leaving them and the state unchanged
+        self._scan_moves = np.zeros(n_states, dtype=np.int32)
+        self._scan_stops = np.ones((n_states, n_symbols), dtype=np.bool_)
+        symbol_ids = np.arange(n_symbols)
+        for i in range(n_states):
+            for direction in ['R', 'L']:
+                loops = ((self._trans_table[i, :, 0] == i) & (self._trans_table[i, :, 1] == symbol_ids)
+                         & (self._trans_table[i, :, 2] == DIR_CODES[direction]))
+                if loops.any():
+                    self._scan_moves[i] = DIR_DELTA[DIR_CODES[direction]]
+                    self._scan_stops[i] = ~loops
+                    break
+
+        self._compile_steps()
+
+    def _compile_steps(self):
+        """Generate a step function for each state, which only has to dispatch on the read symbol."""
+        self._step_by_state = []
+        for i in range(len(self._state_names)):
+            lines = [f'def step_{i}(self):']
+            if i not in self._halt_ids:
+                lines.append('    symbol = self._buf.item(self._head)')
+                branch = 'if'
+                for j in range(len(self._symbols)):
+                    new_state, write_symbol, dir_code = self._trans_table[i, j]
+                    if new_state == NO_TRANSITION:
+                        continue
+                    lines.append(f'    {branch} symbol == {j}:')
+                    branch = 'elif'
+                    if write_symbol != j:
+                        lines.append(f'        self._buf[self._head] = {write_symbol}')
+                        lines.append('        written = self._head')
+                    else:
+                        lines.append('        written = None')
+                    lines.append(f'        self._state = {new_state}')
+                    if DIR_DELTA[dir_code] != 0:
+                        lines.append(f'        self._head += {DIR_DELTA[dir_code]}')
+                        lines.append('        if self._head < self._lo or self._head > self._hi:')
+                        lines.append('            self._extend()')
+                        lines.append('            written = self._head')
+                    lines.append('        if written is not None:')
+                    lines.append('            written -= self._lo')
+                    lines.append(f'        return (*trans_raw[{j}], written)')
+                # No transition defined, move to the reject state
+                lines.append(f'    self._state = {self._halt_ids[1]}')
+            lines.append('    return None')
+            namespace = {'trans_raw': self._trans_raw[i]}
+            exec('\n'.join(lines), namespace)
+            self._step_by_state.append(namespace[f'step_{i}'])
+
+    def _compile_decoder(self):
+        """Prepare turning symbol ids back into text, with bytes.translate when every symbol is one ASCII character."""
+        if len(self._symbols) > np.iinfo(np.int8).max:
+            raise ValueError(f"At most {np.iinfo(np.int8).max} distinct tape symbols are supported")
+        if all(len(c) == 1 and c.isascii() for c in self._symbols):
+            self._id_to_ascii = bytes(ord(c) for c in self._symbols).ljust(256, b'?')
+        else:
+            self._id_to_ascii = None
+
+    def _decode(self, cells):
+        """Turn a bytes string of symbol ids into the tape text."""
+        if self._id_to_ascii is None:
+            return ''.join([self._symbols[i] for i in cells])
+        return cells.translate(self._id_to_ascii).decode('ascii')
+
+    def _intern_symbols(self, symbols):
+        """
+        Return the ids of the given tape symbols, adding any the machine does not know.
+        Unknown symbols have no transitions, so reading one rejects the input.
+        """
+        new_symbols = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self._symbol_id]
+        if new_symbols:
+            # Check before changing anything, so a failed load leaves the machine as it was
+            if len(self._symbols) + len(new_symbols) > np.iinfo(np.int8).max:
+                raise ValueError(f"At most {np.iinfo(np.int8).max} distinct tape symbols are supported")
+            for symbol in new_symbols:
+                self._symbol_id[symbol] = len(self._symbols)
+                self._symbols.append(symbol)
+            n_states = len(self._state_names)
+            self._trans_table = np.concatenate(
+                (self._trans_table, np.full((n_states, len(new_symbols), 3), NO_TRANSITION, dtype=np.int32)), axis=1)
+            self._scan_stops = np.concatenate(
+                (self._scan_stops, np.ones((n_states, len(new_symbols)), dtype=np.bool_)), axis=1)
+            for trans_raw in self._trans_raw:
+                trans_raw += [None] * len(new_symbols)
+            self._compile_decoder()
+            self._compile_steps()
+        return [self._symbol_id[symbol] for symbol in symbols]
+
     def reset(self):
         """Reset the Turing machine to its initial state and clear the tape."""
-        self.tape = [self.blank_symbol]
-        self.head_position = 0
+        self.load_tape('')
         self.current_state = self.start_state
 
     def load_tape(self, input_string):
         """Load the tape with the given input string."""
-        self.tape = list(input_string)
-        self.head_position = 0
+        symbols = self._intern_symbols(input_string) or [self._symbol_id[self.blank_symbol]]
+        self._buf = np.full(max(INITIAL_TAPE_SIZE, 2 * len(symbols)), self._symbol_id[self.blank_symbol], dtype=np.int8)
+        # Start in the middle so the tape can grow either way before reallocating
+        self._lo = (len(self._buf) - len(symbols)) // 2
+        self._hi = self._lo + len(symbols) - 1
+        self._buf[self._lo:self._hi + 1] = symbols
+        self._head = self._lo
+
+    def _grow(self, left):
+        """Double the tape buffer, keeping the old contents on the side away from the head."""
+        size = len(self._buf)
+        buf = np.full(2 * size, self._symbol_id[self.blank_symbol], dtype=np.int8)
+        offset = size if left else 0
+        buf[offset:offset + size] = self._buf
+        self._buf = buf
+        self._head += offset
+        self._lo += offset
+        self._hi += offset
+
+    def _extend(self):
+        """Extend the written part of the tape to the head, growing the buffer until the head is on it."""
+        while self._head < 0 or self._head >= len(self._buf):
+            self._grow(left=self._head < 0)
+        self._lo = min(self._lo, self._head)
+        self._hi = max(self._hi, self._head)
+
+    @property
+    def tape(self):
+        """The written part of the tape as a string."""
+        return self._decode(self._buf[self._lo:self._hi + 1].tobytes())
+
+    @tape.setter
+    def tape(self, tape):
+        head_position = self.head_position
+        self.load_tape(tape)
+        self.head_position = head_position
+
+    @property
+    def current_state(self):
+        """The name of the current state."""
+        return self._state_names[self._state]
+
+    @current_state.setter
+    def current_state(self, state):
+        self._state = self._state_id[state]
+
+    @property
+    def head_position(self):
+        """The head position relative to the leftmost written cell."""
+        return self._head - self._lo
+
+    @head_position.setter
+    def head_position(self, head_position):
+        self._head = self._lo + head_position
+        if self._head < self._lo or self._head > self._hi:
+            self._extend()
 
     def step(self):
         """
         Perform one step of the Turing machine.
         :return: True if the machine should continue, False if it has halted.
         """
-        if self.current_state in [self.accept_state, self.reject_state]:
-            # Halt if the machine is in an accepting or rejecting state
-            return None
-
-        # Read the symbol at the current head position
-        current_symbol = self.tape[self.head_position] if self.head_position < len(self.tape) else self.blank_symbol
-
-        # Get the transition based on the current state and read symbol
-        key = (self.current_state, current_symbol)
-        if key not in self.transitions:
-            # No transition defined, move to the reject state
-            self.current_state = self.reject_state
-            return None
-
-        # Transition logic
-        written = None
-        new_state, write_symbol, direction = self.transitions[key]
-        self.current_state = new_state
-
-        # Write the symbol on the tape
-        if self.head_position < len(self.tape):
-            if self.tape[self.head_position] != write_symbol:
-                written = self.head_position
-            self.tape[self.head_position] = write_symbol
-        else:
-            self.tape.append(write_symbol)
-
-        # Move the head
-        if direction == 'R':  # Move right
-            self.head_position += 1
-            if self.head_position >= len(self.tape):
-                self.tape.append(self.blank_symbol)
-                written = self.head_position
-        elif direction == 'L':  # Move left
-            if self.head_position > 0:
-                self.head_position -= 1
-            else:
-                self.tape.insert(0, self.blank_symbol)
-                self.head_position = 0
-                written = self.head_position
-
-        # Continue the execution
-        return self.transitions[key] + (written,)
+        return self._step_by_state[self._state](self)
 
     def formatTape(self, tape, head_pos, changed_symbol_pos):
+        # Only the head and changed cells are colored, so splice those into the plain tape
+        colors = {head_pos: Fore.BLUE}
+        if changed_symbol_pos is not None:
+            colors[changed_symbol_pos] = Fore.MAGENTA
         s = []
-        for i, c in enumerate(tape):
-            if i == changed_symbol_pos:
-                s.append(Fore.MAGENTA + c + Style.RESET_ALL)
-            elif i == head_pos:
-                s.append(Fore.BLUE + c + Style.RESET_ALL)
-            else:
-                s.append(c)
+        end = 0
+        for i in sorted(colors):
+            if i < len(tape):
+                s.append(tape[end:i] + colors[i] + tape[i] + Style.RESET_ALL)
+                end = i + 1
+        s.append(tape[end:])
         return ''.join(s)
 
     def run(self, max_steps=1000):
@@ -114,49 +257,172 @@ class TuringMachine:
         :param max_steps: The maximum number of steps to execute.
         """
 
-        def makeRow(step_count, step_log):
+        def makeRow(step_count, state, tape, head_position, step_log):
             if step_log:
                 new_state, write_symbol, direction, written = step_log
             else:
                 written = None
-                write_symbol = self.tape[self.head_position]
+                write_symbol = tape[head_position]
                 direction = ' '
-            changed = self.tape[self.head_position] != write_symbol
+            changed = tape[head_position] != write_symbol
             row = []
             row.append(step_count),
-            row.append(self.current_state)
-            row.append(self.formatTape(self.tape, self.head_position, written))
+            row.append(state)
+            row.append(self.formatTape(tape, head_position, written))
             row.append(direction)
             row.append(changed)
             return row
 
+        def logStep(step_log):
+            # Snapshot the tape, it is only formatted once the run is over
+            if step_log and step_log[3] is None:
+                # Nothing was written or extended, share the previous snapshot
+                tape_states.append(tape_states[-1])
+            else:
+                tape_states.append(bytes(self._buf[self._lo:self._hi + 1]))
+            step_logs.append((self.current_state, self.head_position, step_log))
+
         step_count = 0
-        step_log = ""
-        tape_states = [self.tape]
-        output = []
-        row = makeRow(step_count, None)
-        output.append(row)
+        tape_states = []
+        step_logs = []
+        logStep(None)
 
         while step_count < max_steps:
             step_count += 1
             step_log = self.step()
-            tape_states.append(self.tape)
             if not step_log:
-                #row = makeRow(step_count, step_log)
-                #output.append(row)
                 break
-            row = makeRow(step_count, step_log)
-            output.append(row)
+            logStep(step_log)
 
-        headers = ["Step", "State", "Tape", "Direction", "Change"]
-        print(tabulate(output, headers=headers))
+        output = []
+        snapshot = None
+        for step_count, (tape_state, (state, head_position, step_log)) in enumerate(zip(tape_states, step_logs)):
+            if tape_state is not snapshot:
+                snapshot = tape_state
+                tape = self._decode(snapshot)
+            output.append(makeRow(step_count, state, tape, head_position, step_log))
 
         if self.current_state == self.accept_state:
-            print("\nMachine halted in accepting state.")
+            result = "Machine halted in accepting state."
         elif self.current_state == self.reject_state:
-            print("\nMachine halted in rejecting state.")
+            result = "Machine halted in rejecting state."
         else:
-            print("\nMachine did not halt after the maximum number of steps.")
+            result = "Machine did not halt after the maximum number of steps."
+
+        # Write the whole trace at once rather than a print per line
+        headers = ["Step", "State", "Tape", "Direction", "Change"]
+        sys.stdout.write(f"{tabulate(output, headers=headers)}\n\n{result}\n")
+        sys.stdout.flush()
+
+    def run_fast(self, max_steps=1000):
+        """
+        Run the Turing machine using the compiled kernel, without printing.
+        :param max_steps: The maximum number of steps to execute.
+        :return: The number of steps executed.
+        """
+        state = self._state
+        steps = 0
+        halted = state in self._halt_ids
+        while not halted and steps < max_steps:
+            self._head, state, taken, lo, hi = run_tm(self._buf, self._head, state, self._trans_table,
+                                                      self._scan_moves, self._scan_stops, max_steps - steps)
+            self._lo, self._hi = min(self._lo, lo), max(self._hi, hi)
+            halted = taken < max_steps - steps and 0 <= self._head < len(self._buf)
+            steps += taken
+            if self._head < 0 or self._head == len(self._buf):
+                self._grow(left=self._head < 0)
+
+        self._state = state
+        if halted and state not in self._halt_ids:
+            # No transition defined, move to the reject state
+            self.current_state = self.reject_state
+        return steps
+
+class BatchTuringMachine:
+    def __init__(self, machine, input_strings):
+        """
+        Run one Turing machine on many tapes in lockstep, as arrays indexed by tape.
+        :param machine: The TuringMachine whose transitions are used.
+        :param input_strings: A list of input strings, one per tape.
+        """
+        self.machine = machine
+        self.load_tapes(input_strings)
+
+    def load_tapes(self, input_strings):
+        """Load one tape per input string and reset every machine to the start state."""
+        machine = self.machine
+        blank = machine._symbol_id[machine.blank_symbol]
+        longest = max([len(s) for s in input_strings] + [1])
+        self.tapes = np.full((len(input_strings), max(INITIAL_TAPE_SIZE, 2 * longest)), blank, dtype=np.int8)
+        start = (self.tapes.shape[1] - longest) // 2
+        for i, input_string in enumerate(input_strings):
+            self.tapes[i, start:start + len(input_string)] = machine._intern_symbols(input_string)
+        self.heads = np.full(len(input_strings), start, dtype=np.int32)
+        self.states = np.full(len(input_strings), machine._state_id[machine.start_state], dtype=np.int32)
+        self.halted = np.zeros(len(input_strings), dtype=np.bool_)
+        # Inclusive bounds of the written cells of each tape
+        self._lo = self.heads.copy()
+        self._hi = self.heads + np.array([max(len(s), 1) - 1 for s in input_strings], dtype=np.int32)
+
+    def _grow(self, left, right):
+        """Add a blank block the width of the tapes on the requested sides."""
+        width = self.tapes.shape[1]
+        offset = width if left else 0
+        tapes = np.full((len(self.tapes), width * (1 + left + right)), self.machine._symbol_id[self.machine.blank_symbol], dtype=np.int8)
+        tapes[:, offset:offset + width] = self.tapes
+        self.tapes = tapes
+        self.heads += offset
+        self._lo += offset
+        self._hi += offset
+
+    def step_batch(self):
+        """
+        Perform one step of every machine that has not halted.
+        :return: The number of machines still running.
+        """
+        running = np.flatnonzero(~self.halted)
+        heads = self.heads[running]
+        trans = self.machine._trans_table[self.states[running], self.tapes[running, heads]]
+
+        # Machines without a transition halt, and are rejected unless they accepted
+        stopped = trans[:, 0] == NO_TRANSITION
+        self.halted[running[stopped]] = True
+        rejected = running[stopped][~np.isin(self.states[running[stopped]], self.machine._halt_ids)]
+        self.states[rejected] = self.machine._halt_ids[1]
+
+        moving, trans, heads = running[~stopped], trans[~stopped], heads[~stopped]
+        self.tapes[moving, heads] = trans[:, 1]
+        self.states[moving] = trans[:, 0]
+        self.heads[moving] = heads + DIR_DELTA[trans[:, 2]]
+        self._lo[moving] = np.minimum(self._lo[moving], self.heads[moving])
+        self._hi[moving] = np.maximum(self._hi[moving], self.heads[moving])
+        if len(moving) and (self.heads.min() < 0 or self.heads.max() >= self.tapes.shape[1]):
+            self._grow(self.heads.min() < 0, self.heads.max() >= self.tapes.shape[1])
+        return len(moving)
+
+    def run(self, max_steps=1000):
+        """
+        Run every machine until all of them have halted.
+        :param max_steps: The maximum number of steps to execute.
+        :return: The number of steps executed.
+        """
+        step_count = 0
+        while step_count < max_steps and not self.halted.all():
+            if self.step_batch():
+                step_count += 1
+        return step_count
+
+    def tape(self, i):
+        """The written part of tape i as a string."""
+        return self.machine._decode(self.tapes[i, self._lo[i]:self._hi[i] + 1].tobytes())
+
+    def head_position(self, i):
+        """The head position of machine i relative to the leftmost written cell."""
+        return int(self.heads[i] - self._lo[i])
+
+    def current_state(self, i):
+        """The name of the current state of machine i."""
+        return self.machine._state_names[self.states[i]]
 
 # Example usage
 if __name__ == "__main__":
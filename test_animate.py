@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# vim: ft=python ts=4 sw=4 sts=4 et fenc=utf-8
+# Original author: "Eivind Magnus Hvidevold" <hvidevold@gmail.com>
+# License: GNU GPLv3 at http://www.gnu.org/licenses/gpl.html
+
+'''
+Checks that the diff-only animation frames draw the same screen as render.
+'''
+
+import re
+from animate import TuringMachine
+
+def screen(output, lines=None):
+    """
+    Apply the text and the cursor, erase and color escapes used by animate to a screen.
+    :return: The screen as a list of lines, and the set of (row, column) cells drawn red.
+    """
+    lines = [list(line) for line in lines] if lines else [[]]
+    red_cells = set()
+    row, column, red = 0, 0, False
+    for escape, char in re.findall(r'(\x1b\[[0-9;]*[A-Za-z])|(.|\n)', output, re.S):
+        if escape.endswith('H'):
+            row, column = [int(n) - 1 for n in escape[2:-1].split(';')]
+        elif escape == '\x1b[K':
+            del lines[row][column:]
+        elif escape == '\x1b[31m':
+            red = True
+        elif escape == '\x1b[0m':
+            red = False
+        elif char == '\n':
+            row, column = row + 1, 0
+        elif char:
+            while len(lines) <= row:
+                lines.append([])
+            line = lines[row]
+            line.extend(' ' * (column + 1 - len(line)))
+            line[column] = char
+            if red:
+                red_cells.add((row, column))
+            else:
+                red_cells.discard((row, column))
+            column += 1
+    return [''.join(line).rstrip() for line in lines], red_cells
+
+def test_render_update_matches_render():
+    transitions = {
+        ('q0', '1'): ('q0', '1', 'R'),
+        ('q0', '0'): ('q0', '0', 'R'),
+        ('q0', '_'): ('carry', 'x', 'L'),
+        ('carry', '1'): ('carry', '0', 'L'),
+        ('carry', '0'): ('done', '1', 'N'),
+    }
+    machine = TuringMachine(tape='1011', initial_state='q0', transitions=transitions)
+    shown, red_cells = screen(machine.render() + '\n')
+    for _ in range(20):
+        prev_head = machine.head
+        if not machine.step():
+            break
+        shown, red_cells = screen(machine.render_update(prev_head), shown)
+        expected, expected_red = screen(machine.render() + '\n')
+        assert shown == expected
+        assert red_cells == expected_red
+    assert machine.state == 'done'
+    assert shown[0] == 'Tape: 1100x'
+
+def test_non_ascii_symbols():
+    transitions = {
+        ('q0', 'é'): ('q0', 'Ω', 'R'),
+        ('q0', '1'): ('q0', 'ü', 'R'),
+        ('q0', '_'): ('done', '€', 'L'),
+    }
+    machine = TuringMachine(tape=list('é1'), initial_state='q0', transitions=transitions)
+    while machine.step():
+        pass
+    assert screen(machine.render())[0] == ['Tape: Ωü€', 'Head:  ^', 'State: done']
+    assert machine.render_update(2).startswith('\x1b[1;9H€')
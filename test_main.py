@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# vim: ft=python ts=4 sw=4 sts=4 et fenc=utf-8
+# Original author: "Eivind Magnus Hvidevold" <hvidevold@gmail.com>
+# License: GNU GPLv3 at http://www.gnu.org/licenses/gpl.html
+
+'''
+Checks that step, run_fast and BatchTuringMachine agree on the same machines,
+and the tape accessors and run trace of TuringMachine.
+'''
+
+import contextlib
+import io
+import random
+from colorama import Fore, Style
+from main import INITIAL_TAPE_SIZE, BatchTuringMachine, TuringMachine
+
+SYMBOLS = ['0', '1', '_']
+
+def random_transitions(rng, states):
+    """Random transitions, with many self loops so that scanning states show up."""
+    transitions = {}
+    for state in states:
+        for symbol in SYMBOLS:
+            r = rng.random()
+            if r < 0.1:
+                continue
+            elif r < 0.45:
+                transitions[(state, symbol)] = (state, symbol, rng.choice('RL'))
+            else:
+                new_state = rng.choice(states + ['accept', 'reject'])
+                transitions[(state, symbol)] = (new_state, rng.choice(SYMBOLS), rng.choice('RLN'))
+    return transitions
+
+def make_machine(transitions, states):
+    return TuringMachine(states + ['accept', 'reject'], SYMBOLS, transitions, states[0], 'accept', 'reject')
+
+def run_steps(machine, max_steps):
+    """Run by calling step, the way run does, and return the number of steps taken."""
+    step_count = 0
+    while step_count < max_steps and machine.step():
+        step_count += 1
+    return step_count
+
+def result(machine):
+    return machine.tape, machine.head_position, machine.current_state
+
+def check(transitions, states, input_strings, max_steps):
+    expected = []
+    for input_string in input_strings:
+        machine = make_machine(transitions, states)
+        machine.load_tape(input_string)
+        step_count = run_steps(machine, max_steps)
+        expected.append(result(machine))
+
+        machine = make_machine(transitions, states)
+        machine.load_tape(input_string)
+        assert machine.run_fast(max_steps) == step_count
+        assert result(machine) == expected[-1]
+
+        batch = BatchTuringMachine(make_machine(transitions, states), [input_string])
+        assert batch.run(max_steps) == step_count
+
+    batch = BatchTuringMachine(make_machine(transitions, states), input_strings)
+    batch.run(max_steps)
+    for i in range(len(input_strings)):
+        assert (batch.tape(i), batch.head_position(i), batch.current_state(i)) == expected[i]
+
+def test_random_machines():
+    rng = random.Random(0)
+    for _ in range(200):
+        states = [f'q{i}' for i in range(rng.randint(1, 4))]
+        transitions = random_transitions(rng, states)
+        input_strings = [''.join(rng.choice(SYMBOLS) for _ in range(rng.randint(0, 20))) for _ in range(rng.randint(1, 5))]
+        check(transitions, states, input_strings, rng.choice([0, 1, 5, 50, 3000]))
+
+def test_grows_past_initial_tape_size():
+    for direction in 'LR':
+        transitions = {
+            ('q0', '_'): ('q1', '0', direction),
+            ('q1', '_'): ('q0', '1', direction),
+        }
+        check(transitions, ['q0', 'q1'], ['', '_1', '0_0'], 3 * INITIAL_TAPE_SIZE)
+
+def test_unknown_input_symbol_rejects():
+    transitions = {('q0', '0'): ('q0', '0', 'R'), ('q0', '1'): ('q0', '1', 'R'), ('q0', '_'): ('accept', '_', 'N')}
+    check(transitions, ['q0'], ['102', '2', '11'], 100)
+    machine = make_machine(transitions, ['q0'])
+    machine.load_tape('102')
+    machine.run_fast()
+    assert machine.current_state == 'reject'
+
+def scanner():
+    """Scans right over 0 and 1, then writes a 1 on the first blank and steps left."""
+    transitions = {('q0', '0'): ('q0', '0', 'R'), ('q0', '1'): ('q0', '1', 'R'), ('q0', '_'): ('q1', '1', 'L')}
+    return transitions, ['q0', 'q1']
+
+def test_head_position_far_outside_buffer():
+    transitions, states = scanner()
+    for head_position in [5000, 100000, -3000, -100000]:
+        machine = make_machine(transitions, states)
+        machine.load_tape('11')
+        machine.head_position = head_position
+        assert machine.head_position == max(head_position, 0)
+        assert len(machine.tape) == max(head_position + 1, 2) - min(head_position, 0)
+        assert machine.tape[machine.head_position] == '_'
+
+        fast = make_machine(transitions, states)
+        fast.load_tape('11')
+        fast.head_position = head_position
+        assert run_steps(machine, 10) == fast.run_fast(10)
+        assert result(machine) == result(fast)
+        assert machine.tape.count('1') == 3
+
+def test_tape_setter_keeps_head_position():
+    transitions, states = scanner()
+    machine = make_machine(transitions, states)
+    machine.load_tape('0000')
+    machine.head_position = 2
+    machine.tape = '1010'
+    assert machine.tape == '1010'
+    assert machine.head_position == 2
+    assert machine.run_fast() == 3
+    assert result(machine) == ('10101', 3, 'reject')
+
+def test_format_tape():
+    transitions, states = scanner()
+    machine = make_machine(transitions, states)
+    head = Fore.BLUE + 'b' + Style.RESET_ALL
+    changed = Fore.MAGENTA + 'c' + Style.RESET_ALL
+    assert machine.formatTape('abcd', 1, None) == 'a' + head + 'cd'
+    assert machine.formatTape('abcd', 1, 2) == 'a' + head + changed + 'd'
+    assert machine.formatTape('abcd', 2, 2) == 'ab' + changed + 'd'
+
+def test_run_trace():
+    machine = TuringMachine(['q0', 'accept', 'reject'], ['a', 'b', '_'], {('q0', 'a'): ('q0', 'b', 'R')},
+                            'q0', 'accept', 'reject')
+    machine.load_tape('aa')
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        machine.run()
+    blue, magenta, reset = Fore.BLUE, Fore.MAGENTA, Style.RESET_ALL
+    assert output.getvalue() == '\n'.join([
+        '  Step  State    Tape    Direction    Change',
+        '------  -------  ------  -----------  --------',
+        f'     0  q0       {blue}a{reset}a                   False',
+        f'     1  q0       {magenta}b{reset}{blue}a{reset}      R            True',
+        f'     2  q0       bb{magenta}_{reset}     R            True',
+        '',
+        'Machine halted in rejecting state.',
+        '',
+    ])
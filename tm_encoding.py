@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# vim: ft=python ts=4 sw=4 sts=4 et fenc=utf-8
+# Original author: "Eivind Magnus Hvidevold" <hvidevold@gmail.com>
+# License: GNU GPLv3 at http://www.gnu.org/licenses/gpl.html
+
+'''
+Integer encoding of transition tables shared by main.py and tm_kernel.py.
+Kept free of numba so the ahead-of-time compiled kernel can be used without it.
+'''
+
+import numpy as np
+
+# Direction codes used in the compiled transition table
+DIR_CODES = {'R': 0, 'L': 1, 'N': 2}
+
+# Head movement for each direction code
+DIR_DELTA = np.array([1, -1, 0], dtype=np.int32)
+
+# Sentinel for undefined transitions in the compiled transition table
+NO_TRANSITION = -1
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# vim: ft=python ts=4 sw=4 sts=4 et fenc=utf-8
+# Original author: "Eivind Magnus Hvidevold" <hvidevold@gmail.com>
+# License: GNU GPLv3 at http://www.gnu.org/licenses/gpl.html
+
+'''
+Compiled step loop for integer-encoded Turing machines.
+Run this file to build the ahead-of-time compiled tm_kernel_aot extension,
+which main.py prefers over compiling run_tm when it is first called.
+'''
+
+import os
+import numba
+from tm_encoding import DIR_DELTA, NO_TRANSITION
+
+# Signature of the ahead-of-time compiled run_tm
+RUN_TM_SIGNATURE = 'UniTuple(i8, 5)(i1[:], i8, i8, i4[:, :, :], i4[:], b1[:, :], i8)'
+
+@numba.njit(cache=True)
+def run_tm(tape, head, state, trans_table, scan_moves, scan_stops, max_steps):
+    """
+    Run an integer-encoded Turing machine on a fixed-size tape.
+    Stops when no transition is defined, when max_steps transitions have been
+    taken or when the head moves off either end of the tape.
+    :param tape: Tape of symbol ids, modified in place.
+    :param head: Index of the head into the tape.
+    :param state: Id of the current state.
+    :param trans_table: Array of shape (n_states, n_symbols, 3) holding
+                        (new_state, write_symbol, dir_code) or NO_TRANSITION.
+    :param scan_moves: Head movement of each scanning state, 0 for other states.
+    :param scan_stops: Array of shape (n_states, n_symbols), True for the
+                       symbols a scanning state does not just move over.
+    :param max_steps: The maximum number of steps to execute.
+    :return: (head, state, steps, lowest head, highest head)
+    """
+    n = tape.shape[0]
+    lo = head
+    hi = head
+    steps = 0
+    while steps < max_steps:
+        move = scan_moves[state]
+        if move != 0:
+            # Move over the cells the state leaves alone without looking up transitions
+            stops = scan_stops[state]
+            while steps < max_steps and not stops[tape[head]]:
+                head += move
+                steps += 1
+                if head < 0 or head >= n:
+                    break
+            lo = min(lo, head)
+            hi = max(hi, head)
+            if head < 0 or head >= n or steps >= max_steps:
+                break
+        t = trans_table[state, tape[head]]
+        if t[0] == NO_TRANSITION:
+            break
+        tape[head] = t[1]
+        state = t[0]
+        steps += 1
+        head += DIR_DELTA[t[2]]
+        if head < lo or head > hi:
+            # Rare, the head only leaves the visited cells when it reaches new ones
+            lo = min(lo, head)
+            hi = max(hi, head)
+            if head < 0 or head >= n:
+                break
+    return head, state, steps, lo, hi
+
+
+if __name__ == "__main__":
+    from numba.pycc import CC
+
+    cc = CC('tm_kernel_aot')
+    cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+    cc.export('run_tm', RUN_TM_SIGNATURE)(run_tm.py_func)
+    cc.compile()